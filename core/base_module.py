@@ -3,11 +3,32 @@
 Каждый модуль наследуется от BaseModule и реализует свой тип контента
 """
 
+import json
+import os
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Dict, Any, Optional
 import yaml
 
+# Поле сцены -> тип модуля, в порядке приоритета автоопределения
+_FIELD_TO_TYPE = (
+    ('scene', 'manim'),
+    ('component', 'remotion'),
+    ('clip', 'clips'),
+    ('image', 'images'),
+    ('chart', 'dataviz'),
+    ('data', 'dataviz'),
+)
+
+# Поля сцены, задающие только ее место в outline, а не видео
+_POSITION_FIELDS = frozenset({'title', 'timestamp', 'start_time', 'end_time'})
+
+# Начало сборки. Через переменную окружения, чтобы воркеры пула (и при
+# fork, и при spawn) видели время родителя, а не своего старта
+_RUN_STARTED = float(os.environ.setdefault('VIDEO_RUN_STARTED',
+                                           repr(time.time())))
+
 
 class BaseModule(ABC):
     """
@@ -28,6 +49,10 @@ class BaseModule(ABC):
                                                            'renders')) / self.module_type
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+        # Константы на весь рендер, читаются в горячих циклах
+        self._resolution = tuple(config['project']['resolution'])
+        self._fps = int(config['project']['fps'])
+
     @property
     @abstractmethod
     def module_type(self) -> str:
@@ -60,17 +85,85 @@ class BaseModule(ABC):
         """
         pass
 
+    def render_key(self, scene_data: Dict[str, Any]) -> str:
+        """
+        Ключ результата рендера сцены
+
+        Сцены с одинаковым ключом дают одно и то же видео, движок
+        рендерит их один раз. По умолчанию - все поля, кроме места
+        сцены в outline; модули сужают ключ до того, что реально
+        влияет на их видео.
+        """
+        return json.dumps({k: v for k, v in scene_data.items()
+                           if k not in _POSITION_FIELDS},
+                          sort_keys=True, default=str)
+
     def get_duration(self, scene_data: Dict[str, Any]) -> float:
         """Возвращает длительность сцены в секундах"""
         return scene_data.get('duration', 10.0)
 
     def get_resolution(self) -> tuple:
         """Возвращает разрешение из конфига"""
-        return tuple(self.config['project']['resolution'])
+        return self._resolution
 
     def get_fps(self) -> int:
         """Возвращает FPS из конфига"""
-        return self.config['project']['fps']
+        return self._fps
+
+    def cache_lookup(self, output_file: Path, key: str) -> bool:
+        """
+        Проверяет что output_file уже отрендерен с тем же ключом
+
+        Ключ хранится рядом с видео в <output>.meta.json. При попадании
+        mtime метаданных обновляется - по нему работает LRU (cache_store)
+        """
+        meta_file = output_file.with_name(output_file.name + '.meta.json')
+        try:
+            meta = json.loads(meta_file.read_text())
+        except (OSError, ValueError):
+            return False
+
+        if meta.get('key') == key and output_file.exists():
+            os.utime(meta_file)
+            self.log(f"Cache hit: {output_file}")
+            return True
+        return False
+
+    def cache_store(self, output_file: Path, key: str):
+        """
+        Запоминает ключ для отрендеренного output_file
+
+        В output_dir хранится не больше render.cache_size видео с
+        метаданными, самые давно использованные удаляются. Модуль
+        может работать в нескольких процессах сразу, поэтому файлы,
+        удаленные другим процессом, пропускаются, а ошибки вытеснения
+        только логируются - рендер при этом уже успешен. Видео,
+        записанные или взятые из кэша в текущей сборке, не удаляются:
+        их пути уже отданы на сборку финального ролика, так что кэш
+        может временно превысить cache_size.
+        """
+        meta_file = output_file.with_name(output_file.name + '.meta.json')
+        meta_file.write_text(json.dumps({'key': key}))
+
+        cache_size = self.config.get('render', {}).get('cache_size', 200)
+        try:
+            # 2s slack for coarse mtime filesystems
+            run_started = _RUN_STARTED - 2
+            entries = []
+            for meta in self.output_dir.glob('*.meta.json'):
+                try:
+                    entries.append((meta.stat().st_mtime, meta))
+                except FileNotFoundError:
+                    continue
+            entries.sort()
+            for mtime, stale in entries[:-cache_size]:
+                if mtime >= run_started:
+                    break
+                video = stale.with_name(stale.name[:-len('.meta.json')])
+                video.unlink(missing_ok=True)
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            self.log(f"⚠ Cache eviction failed: {e}")
 
     def log(self, message: str):
         """Логирование"""
@@ -83,15 +176,17 @@ class ModuleRegistry:
     Автоматически определяет какой модуль использовать для сцены
     """
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], verbose: bool = True):
         self.config = config
+        self.verbose = verbose
         self.modules: Dict[str, BaseModule] = {}
 
     def register(self, module_class: type):
         """Регистрирует новый модуль"""
         module = module_class(self.config)
         self.modules[module.module_type] = module
-        print(f"✓ Зарегистрирован модуль: {module.module_type}")
+        if self.verbose:
+            print(f"✓ Зарегистрирован модуль: {module.module_type}")
 
     def get_module(self, scene_data: Dict[str, Any]) -> Optional[BaseModule]:
         """
@@ -106,20 +201,13 @@ class ModuleRegistry:
         - chart: data visualization
         """
         # Explicit module type
-        if 'module' in scene_data:
+        if scene_data.get('module'):
             return self.modules.get(scene_data['module'])
 
-        # Auto-detect by fields
-        if 'scene' in scene_data:
-            return self.modules.get('manim')
-        if 'component' in scene_data:
-            return self.modules.get('remotion')
-        if 'clip' in scene_data:
-            return self.modules.get('clips')
-        if 'image' in scene_data:
-            return self.modules.get('images')
-        if 'chart' in scene_data or 'data' in scene_data:
-            return self.modules.get('dataviz')
+        # Auto-detect by fields (Scene dicts carry every field, unset = None)
+        for field, module_type in _FIELD_TO_TYPE:
+            if scene_data.get(field):
+                return self.modules.get(module_type)
 
         # Default fallback
         return self.modules.get('slides')
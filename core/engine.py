@@ -3,14 +3,141 @@
 Координирует работу всех модулей и собирает финальное видео
 """
 
+import multiprocessing
+import os
+import queue
+import sys
+import threading
 import yaml
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import asdict
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import (Progress, SpinnerColumn, TextColumn, BarColumn,
+                           MofNCompleteColumn)
 
 from core.parser import OutlineParser, Scene
 from core.base_module import ModuleRegistry
+from core.gpu import gpu_count
+
+# libyaml C loader when available, pure-Python fallback otherwise
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+def load_config(config_path: Path) -> Dict[str, Any]:
+    """Load configuration from YAML"""
+    if not config_path.exists():
+        raise FileNotFoundError(f"Config not found: {config_path}")
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_Loader)
+
+
+def register_modules(registry: ModuleRegistry, console: Console):
+    """Register all available modules"""
+    # Import modules here to avoid circular imports
+    try:
+        from modules.math.manim_module import ManimModule
+        registry.register(ManimModule)
+    except ImportError as e:
+        console.print(
+            f"[yellow]⚠️  ManimModule not available: {e}[/yellow]")
+
+    try:
+        from modules.slides.remotion_module import RemotionModule
+        registry.register(RemotionModule)
+    except ImportError as e:
+        console.print(
+            f"[yellow]⚠️  RemotionModule not available: {e}[/yellow]")
+
+    try:
+        from modules.images.image_module import ImageModule
+        registry.register(ImageModule)
+    except ImportError as e:
+        console.print(
+            f"[yellow]⚠️  ImageModule not available: {e}[/yellow]")
+
+    # Add more modules as they're created
+
+
+class _QueueWriter:
+    """
+    sys.stdout of a worker process: complete lines go to the parent
+
+    Module logs (BaseModule.log, also from Remotion's stderr threads)
+    are printed by the parent above the live progress bar instead of
+    interleaving with it.
+    """
+
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+        self.pending = ''
+        self.lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self.lock:
+            *lines, self.pending = (self.pending + text).split('\n')
+            for line in lines:
+                self.log_queue.put(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _init_worker(rank_counter, ngpu: int, log_queue):
+    """
+    Pin each worker process to one GPU, round-robin, and route its
+    output to the parent
+
+    NVENC (and anything else CUDA-based) in this worker then only sees
+    its own device, so N GPUs encode in parallel.
+    """
+    with rank_counter.get_lock():
+        rank = rank_counter.value
+        rank_counter.value += 1
+
+    if ngpu:
+        os.environ['CUDA_VISIBLE_DEVICES'] = str(rank % ngpu)
+
+    sys.stdout = _QueueWriter(log_queue)
+
+
+# Registry of the current worker process, built on first use
+_worker_registry: Optional[ModuleRegistry] = None
+
+
+def _render_group(config_path: str, scene_dicts: List[Dict[str, Any]]
+                  ) -> List[Tuple[Dict[str, Any], Path, str]]:
+    """
+    Render a group of scenes of one module inside a worker process
+
+    Runs in a ProcessPoolExecutor, so it only receives picklable data:
+    the config path and the scene dicts. Modules are imported and
+    registered once per worker, not in the parent. Modules exposing
+    render_batch get the whole group in one call.
+    """
+    global _worker_registry
+    if _worker_registry is None:
+        _worker_registry = ModuleRegistry(load_config(Path(config_path)),
+                                          verbose=False)
+        register_modules(_worker_registry, Console(quiet=True))
+
+    module = _worker_registry.get_module(scene_dicts[0])
+    if not module:
+        raise RuntimeError("No module found")
+
+    if hasattr(module, 'render_batch'):
+        video_paths = module.render_batch(scene_dicts)
+    else:
+        video_paths = [module.render(scene_dict) for scene_dict in scene_dicts]
+
+    return [(scene_dict, video_path, module.module_type)
+            for scene_dict, video_path in zip(scene_dicts, video_paths)]
 
 
 class VideoEngine:
@@ -37,45 +164,21 @@ class VideoEngine:
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML"""
-        if not self.config_path.exists():
-            raise FileNotFoundError(f"Config not found: {self.config_path}")
-
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return load_config(self.config_path)
 
     def _register_modules(self):
         """Register all available modules"""
-        # Import modules here to avoid circular imports
-        try:
-            from modules.math.manim_module import ManimModule
-            self.registry.register(ManimModule)
-        except ImportError as e:
-            self.console.print(
-                f"[yellow]⚠️  ManimModule not available: {e}[/yellow]")
-
-        try:
-            from modules.slides.remotion_module import RemotionModule
-            self.registry.register(RemotionModule)
-        except ImportError as e:
-            self.console.print(
-                f"[yellow]⚠️  RemotionModule not available: {e}[/yellow]")
-
-        try:
-            from modules.images.image_module import ImageModule
-            self.registry.register(ImageModule)
-        except ImportError as e:
-            self.console.print(
-                f"[yellow]⚠️  ImageModule not available: {e}[/yellow]")
-
-        # Add more modules as they're created
+        register_modules(self.registry, self.console)
 
-    def build(self, outline_path: str = 'outline.md', output_path: str = None):
+    def build(self, outline_path: str = 'outline.md', output_path: str = None,
+              draft: bool = False):
         """
         Main build process
 
         Args:
             outline_path: Path to outline.md
             output_path: Path for final video (optional)
+            draft: Fast low-quality render for iterating on the outline
         """
         self.console.print(
             "\n[bold cyan]═══════════════════════════════════════[/bold cyan]")
@@ -105,7 +208,7 @@ class VideoEngine:
 
         # Step 3: Render scenes
         self.console.print("\n[bold]🎨 Step 3: Rendering scenes...[/bold]")
-        rendered_scenes = self._render_scenes(scenes)
+        rendered_scenes = self._render_scenes(scenes, draft)
 
         # Step 4: Assemble final video
         self.console.print(
@@ -121,7 +224,7 @@ class VideoEngine:
     def _show_build_plan(self, scenes: List[Scene]):
         """Display build plan"""
         for i, scene in enumerate(scenes, 1):
-            module = self.registry.get_module(scene.__dict__)
+            module = self.registry.get_module(asdict(scene))
             module_name = module.module_type if module else "unknown"
 
             self.console.print(f"  {i}. [{scene.timestamp}] {scene.title}")
@@ -137,44 +240,137 @@ class VideoEngine:
 
             self.console.print()
 
-    def _render_scenes(self, scenes: List[Scene]) -> List[Dict[str, Any]]:
-        """Render all scenes"""
-        rendered = []
-
+    def _render_scenes(self, scenes: List[Scene],
+                       draft: bool = False) -> List[Dict[str, Any]]:
+        """
+        Render all scenes in parallel
+
+        Scenes are independent, so they are rendered in worker processes.
+        Scenes of modules with render_batch (e.g. Manim) are grouped so one
+        backend invocation renders several of them; each module's group is
+        split across the workers, unless the module pools its own workers.
+        Scenes with the same module render_key are rendered once and share
+        the video. Results are returned in outline order.
+        """
+        rendered = {}
+        workers = self.config.get('render', {}).get(
+            'workers', max(1, (os.cpu_count() or 2) - 1))
+        # Worker output, printed here on the main thread
+        log_queue = multiprocessing.Queue()
+
+        # One aggregated bar: a live region per scene re-renders the whole
+        # display on every update
         with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
                 console=self.console
-        ) as progress:
-
+        ) as progress, ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(multiprocessing.Value('i', 0), gpu_count(),
+                          log_queue)
+        ) as pool:
+
+            groups = []
+            batches: Dict[str, list] = {}
+            # (module_type, render_key) -> scenes with the same video as
+            # the first one; rendering them concurrently would have
+            # several workers writing one output file
+            duplicates: Dict[Tuple[str, str], list] = {}
+            render_keys: Dict[int, Tuple[str, str]] = {}
             for i, scene in enumerate(scenes, 1):
-                task = progress.add_task(
-                    f"Rendering {i}/{len(scenes)}: {scene.title}...",
-                    total=None
-                )
+                # One dict per scene, shared by module lookup and render
+                scene_dict = dict(asdict(scene), draft=draft)
 
                 # Get appropriate module
-                module = self.registry.get_module(scene.__dict__)
+                module = self.registry.get_module(scene_dict)
 
                 if not module:
                     self.console.print(
                         f"[yellow]⚠️  No module found for {scene.title}[/yellow]")
                     continue
 
-                # Render scene
-                try:
-                    video_path = module.render(scene.__dict__)
-                    rendered.append({
-                        'scene': scene,
-                        'video_path': video_path,
-                        'module': module.module_type
-                    })
-                    progress.update(task, completed=True)
-                    self.console.print(f"[green]✓ {scene.title}[/green]")
-                except Exception as e:
-                    self.console.print(f"[red]✗ {scene.title}: {e}[/red]")
-
-        return rendered
+                key = (module.module_type, module.render_key(scene_dict))
+                if key in duplicates:
+                    duplicates[key].append((i, scene))
+                    continue
+                duplicates[key] = []
+                render_keys[i] = key
+
+                if hasattr(module, 'render_batch'):
+                    batches.setdefault(module.module_type, []).append(
+                        (i, scene, scene_dict))
+                else:
+                    groups.append([(i, scene, scene_dict)])
+
+            for module_type, items in batches.items():
+                # Modules with their own worker pool (Remotion) get the
+                # whole batch in one process, so the pool cap holds and
+                # its workers are shared by every scene
+                if getattr(self.registry.modules[module_type],
+                           'batch_in_one_process', False):
+                    n = 1
+                else:
+                    n = min(workers, len(items))
+                groups.extend(items[k::n] for k in range(n))
+
+            task = progress.add_task("Rendering", total=len(render_keys) + sum(
+                len(dups) for dups in duplicates.values()))
+
+            futures = {
+                pool.submit(_render_group, str(self.config_path),
+                            [scene_dict for _, _, scene_dict in items]): items
+                for items in groups
+            }
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1,
+                                     return_when=FIRST_COMPLETED)
+                self._print_worker_logs(log_queue)
+                for future in done:
+                    items = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        for i, scene, _ in items:
+                            for _, dup in ([(i, scene)]
+                                           + duplicates[render_keys[i]]):
+                                self.console.print(
+                                    f"[red]✗ {dup.title}: {e}[/red]")
+                                progress.advance(task)
+                        continue
+
+                    for (i, scene, _), (_, video_path, module_type) in zip(
+                            items, results):
+                        # Identical scenes share the first one's video
+                        for j, dup in ([(i, scene)]
+                                       + duplicates[render_keys[i]]):
+                            rendered[j] = {
+                                'scene': dup,
+                                'video_path': video_path,
+                                'module': module_type
+                            }
+                            self.console.print(
+                                f"[green]✓ {dup.title}[/green]")
+                            progress.advance(task)
+
+        # Workers flush their queued lines on exit, after the last result
+        self._print_worker_logs(log_queue)
+
+        return [rendered[i] for i in sorted(rendered)]
+
+    def _print_worker_logs(self, log_queue):
+        """Prints lines queued by worker processes"""
+        while True:
+            try:
+                line = log_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.console.print(line, markup=False, highlight=False,
+                               soft_wrap=True)
 
     def _assemble_video(self, rendered_scenes: List[Dict],
                         output_path: str = None) -> Path:
@@ -0,0 +1,23 @@
+"""
+Определение NVIDIA GPU для аппаратного энкодинга (NVENC)
+"""
+
+import functools
+import subprocess
+
+
+@functools.lru_cache(maxsize=None)
+def gpu_count() -> int:
+    """Количество NVIDIA GPU по `nvidia-smi -L` (0 если драйвера нет)"""
+    try:
+        result = subprocess.run(
+            ['nvidia-smi', '-L'],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return 0
+
+    return sum(1 for line in result.stdout.splitlines()
+               if line.startswith('GPU '))
@@ -4,12 +4,17 @@
 """
 
 import re
+from itertools import pairwise
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from dataclasses import dataclass, field
 
+_HEADER_RE = re.compile(r'(.+?)\s*\[(.+?)\]')
+# "KEY: value" / "KEY: \"value\"", skipping blank lines and # comments
+_PARAM_RE = re.compile(r'\s*([^\s:#][^:]*?)\s*:\s*["\']?(.*?)["\']?\s*$')
 
-@dataclass
+
+@dataclass(slots=True)
 class Scene:
     """Сцена видео"""
     title: str
@@ -60,21 +65,36 @@ class OutlineParser:
 
     def parse(self) -> List[Scene]:
         """Парсит outline и возвращает список сцен"""
+        self.scenes.extend(self.iter_scenes())
+        return self.scenes
+
+    def iter_scenes(self) -> Iterator[Scene]:
+        """
+        Читает outline построчно и отдает сцены по мере закрытия секций
+
+        Файл не загружается в память целиком: в буфере только текущая
+        секция ## (всё до первой секции - заголовок документа).
+        """
         if not self.outline_path.exists():
             raise FileNotFoundError(
                 f"Outline file not found: {self.outline_path}")
 
-        content = self.outline_path.read_text(encoding='utf-8')
-
-        # Split by ## headers
-        sections = re.split(r'\n## ', content)
-
-        for section in sections[1:]:  # Skip document title
-            scene = self._parse_section(section)
-            if scene:
-                self.scenes.append(scene)
-
-        return self.scenes
+        with self.outline_path.open('r', encoding='utf-8') as f:
+            section = []
+            for line in f:
+                if line.startswith('## '):
+                    if section:
+                        scene = self._parse_section(''.join(section))
+                        if scene:
+                            yield scene
+                    section = [line[3:]]
+                elif section:
+                    section.append(line)
+
+            if section:
+                scene = self._parse_section(''.join(section))
+                if scene:
+                    yield scene
 
     def _parse_section(self, section: str) -> Scene:
         """Parse one section into Scene"""
@@ -84,7 +104,7 @@ class OutlineParser:
 
         # Parse header: "Title [MM:SS-MM:SS]"
         header = lines[0]
-        match = re.match(r'(.+?)\s*\[(.+?)\]', header)
+        match = _HEADER_RE.match(header)
 
         if not match:
             return None
@@ -150,16 +170,14 @@ class OutlineParser:
         params = {}
 
         for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
+            match = _PARAM_RE.match(line)
+            if not match:
                 continue
 
-            if ':' in line:
-                key, value = line.split(':', 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
+            key, value = match.group(1), match.group(2)
 
-                # Try to convert to number
+            # Try to convert to number
+            if value and (value[0].isdigit() or value[0] in '-+.'):
                 try:
                     value = float(value)
                     if value.is_integer():
@@ -167,7 +185,7 @@ class OutlineParser:
                 except ValueError:
                     pass
 
-                params[key] = value
+            params[key] = value
 
         return params
 
@@ -184,8 +202,7 @@ class OutlineParser:
             return False
 
         # Check for overlaps
-        for i, scene in enumerate(self.scenes[:-1]):
-            next_scene = self.scenes[i + 1]
+        for scene, next_scene in pairwise(self.scenes):
             if scene.end_time > next_scene.start_time:
                 print(
                     f"⚠️  Scene overlap: {scene.title} ends at {scene.end_time}s but {next_scene.title} starts at {next_scene.start_time}s")
@@ -32,6 +32,9 @@ Examples:
   # Указать output путь
   python main.py --output output/my_video.mp4
 
+  # Быстрый черновой рендер
+  python main.py --draft
+
   # Список доступных модулей
   python main.py --list-modules
         """
@@ -54,6 +57,12 @@ Examples:
         help='Path to config.yaml (default: config.yaml)'
     )
 
+    parser.add_argument(
+        '--draft', '-d',
+        action='store_true',
+        help='Fast draft render (ultrafast preset, lower quality)'
+    )
+
     parser.add_argument(
         '--list-modules', '-l',
         action='store_true',
@@ -71,7 +80,8 @@ Examples:
 
         engine.build(
             outline_path=args.outline,
-            output_path=args.output
+            output_path=args.output,
+            draft=args.draft
         )
 
     except FileNotFoundError as e:
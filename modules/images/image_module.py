@@ -3,9 +3,40 @@ Image модуль - статичные изображения с эффекта
 Для: показ изображений, фотографий, скриншотов с эффектами (zoom, pan, Ken Burns)
 """
 
+import hashlib
+import subprocess
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from core.base_module import BaseModule
+from core.gpu import gpu_count
+
+# Тяжелые зависимости, импортируются при первом рендере (_import_deps)
+_moviepy = None
+_np = None
+_cv2 = None
+_Image = None
+
+
+# Модуль -> пакет pip для подсказки при ImportError
+_PIP_NAMES = {'cv2': 'opencv-python', 'PIL': 'Pillow'}
+
+
+def _import_deps(warp: bool = False):
+    """
+    Импортирует зависимости один раз на процесс
+
+    moviepy нужен всегда; numpy, OpenCV и PIL - только эффектам с
+    трансформацией кадра (warp), 'static' работает без OpenCV.
+    """
+    global _moviepy, _np, _cv2, _Image
+    if _moviepy is None:
+        from moviepy import editor
+        _moviepy = editor
+    if warp and _cv2 is None:
+        import numpy as np
+        import cv2
+        from PIL import Image
+        _np, _cv2, _Image = np, cv2, Image
 
 
 class ImageModule(BaseModule):
@@ -24,6 +55,9 @@ class ImageModule(BaseModule):
     IMAGE: path/to/image.png  # автоматически использует ImageModule
     """
 
+    # Вывод `ffmpeg -encoders`, проверяется один раз на процесс
+    _ffmpeg_encoders: Optional[str] = None
+
     @property
     def module_type(self) -> str:
         return "images"
@@ -41,6 +75,7 @@ class ImageModule(BaseModule):
                 'image': 'assets/images/chart.png',
                 'duration': 5.0,
                 'effect': 'zoom_in',  # zoom_in, zoom_out, pan_right, ken_burns, static
+                'draft': False,       # быстрый черновой энкод (опционально)
             }
 
         Returns:
@@ -55,94 +90,167 @@ class ImageModule(BaseModule):
 
         self.log(f"Creating video from image: {image_path.name}")
 
-        # Output path
-        output_file = self.output_dir / f"{image_path.stem}_{effect}.mp4"
+        codec, preset, ffmpeg_params = self._encoder_settings(
+            scene_data.get('draft', False))
+        # MoviePy only adds yuv420p for libx264 at even frame sizes, and
+        # static clips are piped at the source image size - without it
+        # odd-sized images come out as yuv444p that many players can't decode
+        ffmpeg_params = ffmpeg_params + ['-pix_fmt', 'yuv420p']
+
+        # Skip encoding if the image and render settings are unchanged
+        key = hashlib.sha256(image_path.read_bytes() + repr((
+            self.get_resolution(), self.get_fps(), effect, duration,
+            codec, preset, ffmpeg_params)).encode()).hexdigest()
+
+        # Output path. The key is part of the name, so scenes with the same
+        # image and effect but different duration/settings don't share a file
+        output_file = self.output_dir / f"{image_path.stem}_{effect}-{key[:16]}.mp4"
+
+        if self.cache_lookup(output_file, key):
+            return output_file
 
         # Use MoviePy to create video from image
         try:
-            from moviepy.editor import ImageClip, CompositeVideoClip
-            import numpy as np
+            _import_deps(warp=effect != 'static')
 
-            # Load image
-            clip = ImageClip(str(image_path), duration=duration)
+            if effect != 'static':
+                # Decode once, every frame is warped from this array
+                src = _np.asarray(_Image.open(image_path).convert('RGB'))
 
             # Apply effect
             if effect == 'zoom_in':
-                clip = self._apply_zoom_in(clip, duration)
+                clip = self._apply_zoom_in(src, duration)
             elif effect == 'zoom_out':
-                clip = self._apply_zoom_out(clip, duration)
+                clip = self._apply_zoom_out(src, duration)
             elif effect == 'pan_right':
-                clip = self._apply_pan_right(clip, duration)
+                clip = self._apply_pan_right(src, duration)
             elif effect == 'ken_burns':
-                clip = self._apply_ken_burns(clip, duration)
-            # 'static' = no effect
-
-            # Set resolution
-            clip = clip.resize(self.get_resolution())
-
-            # Render
+                clip = self._apply_ken_burns(src, duration)
+            else:
+                # 'static' = no effect
+                clip = _moviepy.ImageClip(str(image_path), duration=duration)
+
+            # Render. Scaling to the output resolution is done by ffmpeg
+            # (swscale) instead of resampling every frame in Python/PIL;
+            # for warped effects the frames are already at that size
+            W, H = self.get_resolution()
             clip.write_videofile(
                 str(output_file),
                 fps=self.get_fps(),
-                codec=self.config['render']['codec'],
-                preset=self.config['render']['preset'],
+                codec=codec,
+                preset=preset,
+                ffmpeg_params=ffmpeg_params + [
+                    '-vf', f'scale={W}:{H}:flags=bicubic'],
                 audio=False,
                 verbose=False,
                 logger=None
             )
 
             clip.close()
+            self.cache_store(output_file, key)
 
             self.log(f"✓ Created: {output_file}")
             return output_file
 
-        except ImportError:
-            self.log("✗ MoviePy not installed! Run: pip install moviepy")
+        except ImportError as e:
+            package = _PIP_NAMES.get(e.name, e.name or 'moviepy')
+            self.log(f"✗ {e.name} not installed! Run: pip install {package}")
             raise
 
-    def _apply_zoom_in(self, clip, duration):
-        """Zoom in effect (1.0 → 1.2x scale)"""
-        from moviepy.video.fx import resize
+    def render_key(self, scene_data: Dict[str, Any]) -> str:
+        """Видео зависит от изображения, эффекта, длительности и draft"""
+        return repr((scene_data['image'], scene_data.get('effect', 'static'),
+                     scene_data.get('duration', 5.0),
+                     bool(scene_data.get('draft'))))
 
-        def zoom(t):
-            zoom_factor = 1.0 + 0.2 * (t / duration)
-            return clip.resize(zoom_factor)
+    def _encoder_settings(self, draft: bool) -> Tuple[str, str, List[str]]:
+        """
+        Возвращает (codec, preset, ffmpeg_params) для write_videofile
 
-        return clip.fl(lambda gf, t: zoom(t).get_frame(t))
+        draft: ultrafast x264 с crf 28 вместо пресета из конфига.
+        render.hwaccel: true - NVENC, auto (по умолчанию) - NVENC если
+        есть NVIDIA GPU; в обоих случаях только если ffmpeg собран
+        с h264_nvenc, иначе libx264.
+        """
+        render = self.config['render']
+        crf = 28 if draft else render.get('crf', 23)
+
+        hwaccel = render.get('hwaccel', 'auto')
+        use_nvenc = hwaccel is True or (hwaccel == 'auto' and gpu_count() > 0)
+
+        if use_nvenc and self._has_encoder('h264_nvenc'):
+            return ('h264_nvenc', 'p1' if draft else 'p4',
+                    ['-rc', 'vbr', '-cq', str(crf)])
+
+        if draft:
+            return ('libx264', render.get('draft_preset', 'ultrafast'),
+                    ['-crf', str(crf)])
+        return render['codec'], render['preset'], ['-crf', str(crf)]
+
+    @classmethod
+    def _has_encoder(cls, name: str) -> bool:
+        """Проверяет что ffmpeg (тот же, что у MoviePy) умеет энкодер"""
+        if cls._ffmpeg_encoders is None:
+            try:
+                from moviepy.config import get_setting
+                result = subprocess.run(
+                    [get_setting('FFMPEG_BINARY'), '-hide_banner', '-encoders'],
+                    capture_output=True,
+                    text=True
+                )
+                cls._ffmpeg_encoders = result.stdout
+            except (ImportError, OSError):
+                cls._ffmpeg_encoders = ''
+        return f" {name} " in cls._ffmpeg_encoders
+
+    def _apply_zoom_in(self, src, duration):
+        """Zoom in effect (1.0 → 1.2x scale)"""
+        return self._warp_clip(src, duration,
+                               lambda p: (1.0 + 0.2 * p, 0.5))
 
-    def _apply_zoom_out(self, clip, duration):
+    def _apply_zoom_out(self, src, duration):
         """Zoom out effect (1.2 → 1.0x scale)"""
-        from moviepy.video.fx import resize
-
-        def zoom(t):
-            zoom_factor = 1.2 - 0.2 * (t / duration)
-            return clip.resize(zoom_factor)
+        return self._warp_clip(src, duration,
+                               lambda p: (1.2 - 0.2 * p, 0.5))
 
-        return clip.fl(lambda gf, t: zoom(t).get_frame(t))
+    def _apply_pan_right(self, src, duration):
+        """Pan right effect (1.3x scale, left edge → right edge)"""
+        return self._warp_clip(src, duration, lambda p: (1.3, p))
 
-    def _apply_pan_right(self, clip, duration):
-        """Pan right effect"""
-        # Increase clip width and pan across
-        clip = clip.resize(width=int(self.get_resolution()[0] * 1.3))
+    def _apply_ken_burns(self, src, duration):
+        """Ken Burns effect (zoom 1.2 → 1.5x + pan right)"""
+        return self._warp_clip(src, duration,
+                               lambda p: (1.2 + 0.3 * p, p))
 
-        def pan(t):
-            x_offset = int(
-                (clip.w - self.get_resolution()[0]) * (t / duration))
-            return clip.crop(x1=x_offset, width=self.get_resolution()[0])
-
-        return clip.fl(lambda gf, t: pan(t).get_frame(t))
-
-    def _apply_ken_burns(self, clip, duration):
-        """Ken Burns effect (zoom + pan)"""
-        # Combine zoom and pan
-        clip = clip.resize(width=int(self.get_resolution()[0] * 1.5))
-
-        def ken_burns(t):
-            progress = t / duration
-            zoom_factor = 1.0 + 0.3 * progress
-            x_offset = int((clip.w - self.get_resolution()[0]) * progress)
+    def _warp_clip(self, src, duration, transform):
+        """
+        Строит клип, трансформируя исходное изображение на каждом кадре
 
-            zoomed = clip.resize(zoom_factor)
-            return zoomed.crop(x1=x_offset, width=self.get_resolution()[0])
+        Каждый кадр - один cv2.warpAffine сразу в целевое разрешение,
+        без пересоздания ImageClip и ресемплинга через PIL.
 
-        return clip.fl(lambda gf, t: ken_burns(t).get_frame(t))
\ No newline at end of file
+        Args:
+            src: RGB массив исходного изображения
+            duration: длительность клипа
+            transform: progress (0..1) -> (scale, x_align)
+                scale - масштаб относительно заполнения кадра
+                x_align - 0 = видна левая граница, 1 = правая
+        """
+        W, H = self.get_resolution()
+        h, w = src.shape[:2]
+        cover = max(W / w, H / h)
+
+        # Один буфер кадра на клип: MoviePy копирует кадр в пайп ffmpeg
+        # до следующего вызова make_frame, так что его можно переиспользовать
+        frame = _np.empty((H, W, 3), dtype=_np.uint8)
+
+        def make_frame(t):
+            scale, x_align = transform(t / duration)
+            s = cover * scale
+            M = _np.array([[s, 0, (W - s * w) * x_align],
+                           [0, s, (H - s * h) * 0.5]], dtype=_np.float32)
+            return _cv2.warpAffine(src, M, (W, H), dst=frame,
+                                   flags=_cv2.INTER_LINEAR)
+
+        clip = _moviepy.VideoClip(make_frame, duration=duration)
+        return clip.set_fps(self.get_fps())
@@ -3,11 +3,24 @@ Manim модуль - математические анимации и графи
 Для: формулы, графики, диаграммы, математические визуализации
 """
 
+import ast
+import hashlib
 import subprocess
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from core.base_module import BaseModule
 
+# Файл со сценами
+_SCENES_FILE = Path('manim/manim_module.py')
+
+# quality -> (флаг manim, папка в media/videos/<file>/)
+_QUALITY = {
+    'low': ('-ql', '480p15'),
+    'medium': ('-qm', '720p30'),
+    'high': ('-qh', '1080p60'),
+    'ultra': ('-qk', '2160p60'),
+}
+
 
 class ManimModule(BaseModule):
     """
@@ -24,6 +37,9 @@ class ManimModule(BaseModule):
     SCENE: InflationFormula  # автоматически использует ManimModule
     """
 
+    # (path, mtime) -> имена сцен, см. get_available_scenes
+    _scenes_cache: Dict[Tuple[str, float], List[str]] = {}
+
     @property
     def module_type(self) -> str:
         return "manim"
@@ -41,52 +57,99 @@ class ManimModule(BaseModule):
                 'scene': 'InflationFormula',  # имя класса в manim/manim_module.py
                 'duration': 10.0,              # длительность (опционально)
                 'quality': 'high',             # low, medium, high (опционально)
+                'draft': False,                # рендер в low (опционально)
             }
 
         Returns:
             Path к видео файлу
         """
-        scene_name = scene_data['scene']
-        quality = scene_data.get('quality',
-                                 self.config['render'].get('quality',
-                                                           'medium'))
+        return self.render_batch([scene_data])[0]
 
-        self.log(f"Rendering Manim scene: {scene_name}")
+    def render_batch(self, scene_data_list: List[Dict[str, Any]]) -> List[Path]:
+        """
+        Рендерит несколько Manim сцен одним вызовом manim
 
-        # Quality flags
-        quality_flags = {
-            'low': '-ql',
-            'medium': '-qm',
-            'high': '-qh',
-            'ultra': '-qk'
-        }
-        quality_flag = quality_flags.get(quality, '-qm')
+        Запуск manim (импорт numpy/cairo/pango, конфиг) стоит сотни мс,
+        поэтому сцены одного качества передаются в одну команду.
+
+        Returns:
+            Пути к видео файлам в порядке scene_data_list
+        """
+        source = _SCENES_FILE.read_bytes() if _SCENES_FILE.exists() else None
+
+        outputs = []
+        pending: Dict[str, list] = {}
+        for scene_data in scene_data_list:
+            scene_name = scene_data['scene']
+            quality = self._quality(scene_data)
+
+            # Output path (quality in the name: one scene may be rendered
+            # at several qualities in the same batch)
+            output_file = self.output_dir / f"{scene_name}-{quality}.mp4"
+            outputs.append(output_file)
+
+            # Skip rendering if the scenes file and settings are unchanged
+            key = None
+            if source is not None:
+                key = hashlib.sha256(source + repr(
+                    (scene_name, _QUALITY[quality][0])).encode()).hexdigest()
+                if self.cache_lookup(output_file, key):
+                    continue
+
+            pending.setdefault(quality, []).append(
+                (scene_name, output_file, key))
+
+        for quality, jobs in pending.items():
+            self._render_jobs(quality, jobs)
+
+        return outputs
+
+    def render_key(self, scene_data: Dict[str, Any]) -> str:
+        """Видео Manim зависит только от сцены и качества"""
+        return f"{scene_data['scene']}\0{self._quality(scene_data)}"
+
+    def _quality(self, scene_data: Dict[str, Any]) -> str:
+        """Качество рендера сцены: draft - всегда low"""
+        if scene_data.get('draft'):
+            return 'low'
+        quality = scene_data.get('quality',
+                                 self.config['render'].get('quality', 'medium'))
+        return quality if quality in _QUALITY else 'medium'
 
-        # Output path
-        output_file = self.output_dir / f"{scene_name}.mp4"
+    def _render_jobs(self, quality: str, jobs: list):
+        """Рендерит сцены одного качества и раскладывает видео по output_dir"""
+        quality_flag, quality_dir = _QUALITY[quality]
+        media_dir = self.output_dir / 'media'
+        scene_names = list(dict.fromkeys(name for name, _, _ in jobs))
+
+        self.log(f"Rendering Manim scenes: {', '.join(scene_names)}")
 
         # Manim command
         cmd = [
             'manim',
             quality_flag,
             '--format', 'mp4',
-            '-o', str(output_file),
-            'manim/manim_module.py',
-            scene_name
+            '--media_dir', str(media_dir),
+            str(_SCENES_FILE),
+            *scene_names
         ]
 
         self.log(f"Command: {' '.join(cmd)}")
 
+        # manim кладет видео в media/videos/<file>/<quality>/<Scene>.mp4.
+        # Старые файлы удаляются заранее: после рендера там должны быть
+        # только свежие видео, а не остатки прошлых запусков
+        videos_dir = media_dir / 'videos' / _SCENES_FILE.stem / quality_dir
+        for scene_name in scene_names:
+            (videos_dir / f"{scene_name}.mp4").unlink(missing_ok=True)
+
         try:
-            result = subprocess.run(
+            subprocess.run(
                 cmd,
                 check=True,
                 capture_output=True,
                 text=True
             )
-            self.log(f"✓ Rendered: {output_file}")
-            return output_file
-
         except subprocess.CalledProcessError as e:
             self.log(f"✗ Manim error: {e.stderr}")
             raise
@@ -94,16 +157,48 @@ class ManimModule(BaseModule):
             self.log("✗ Manim not installed! Run: pip install manim")
             raise
 
+        # manim может выйти с кодом 0 и без видео (неизвестная сцена,
+        # manim.cfg с другим frame_rate/video_dir) - это ошибка рендера
+        missing = []
+        moved = set()
+        for scene_name, output_file, key in jobs:
+            if output_file in moved:  # duplicate scene in this batch
+                continue
+            rendered = videos_dir / f"{scene_name}.mp4"
+            if not rendered.exists():
+                missing.append(scene_name)
+                continue
+            rendered.replace(output_file)
+            moved.add(output_file)
+            if key:
+                self.cache_store(output_file, key)
+            self.log(f"✓ Rendered: {output_file}")
+
+        if missing:
+            self.log(f"✗ Manim produced no video for: {', '.join(missing)}")
+            raise FileNotFoundError(
+                f"Manim produced no video for {', '.join(missing)} "
+                f"in {videos_dir}")
+
     def get_available_scenes(self) -> list:
         """Возвращает список доступных Manim сцен"""
-        scenes_file = Path('manim/manim_module.py')
+        scenes_file = _SCENES_FILE
         if not scenes_file.exists():
             return []
 
-        # Simple regex to find class definitions
-        import re
-        content = scenes_file.read_text()
-        pattern = r'class\s+(\w+)\s*\(.*Scene\)'
-        scenes = re.findall(pattern, content)
+        key = (str(scenes_file), scenes_file.stat().st_mtime)
+        cached = self._scenes_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Classes deriving from Scene, ThreeDScene, manim.MovingCameraScene...
+        tree = ast.parse(scenes_file.read_bytes())
+        scenes = [
+            node.name for node in ast.walk(tree)
+            if isinstance(node, ast.ClassDef) and any(
+                getattr(base, 'id', getattr(base, 'attr', '')).endswith('Scene')
+                for base in node.bases)
+        ]
 
-        return scenes
\ No newline at end of file
+        self._scenes_cache[key] = scenes
+        return scenes
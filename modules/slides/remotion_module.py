@@ -3,11 +3,109 @@ Remotion модуль - слайды и UI элементы
 Для: титульные карточки, текстовые слайды, UI анимации
 """
 
+import asyncio
+import atexit
+import collections
+import hashlib
+import json
+import os
+import queue
 import subprocess
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Tuple
 from core.base_module import BaseModule
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Node-скрипт постоянного воркера (запускается из remotion/)
+_WORKER_SCRIPT = Path('remotion/worker.mjs')
+
+# Поля сцены/сегмента, которые не передаются компоненту как props
+_RESERVED_PROPS = frozenset({
+    'component', 'duration', 'module', 'draft',
+    'type', 'seg_type', 'visual', 'scene',
+    'timestamp', 'start_time', 'end_time',
+    'clip', 'image', 'chart', 'data',
+})
+
+
+def _dumps(obj: Any) -> bytes:
+    """JSON в bytes: orjson если установлен, иначе stdlib json"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+class RemotionWorker:
+    """
+    Долгоживущий процесс node worker.mjs
+
+    Node, V8 и webpack-бандл Remotion поднимаются один раз при старте,
+    дальше каждая задача - одна JSON-строка в stdin и одна строка
+    ответа в stdout. stderr воркера читается отдельным потоком в лог.
+    """
+
+    def __init__(self, log: Callable[[str], None], entry: str = 'src/index.ts'):
+        self.cmd = ['node', _WORKER_SCRIPT.name, entry]
+        self.proc = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=_WORKER_SCRIPT.parent,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+        self.tail = collections.deque(maxlen=20)
+        self._stderr = threading.Thread(target=self._drain, args=(log,),
+                                        daemon=True)
+        self._stderr.start()
+
+    def _drain(self, log: Callable[[str], None]):
+        for line in self.proc.stderr:
+            line = line.rstrip()
+            log(line)
+            self.tail.append(line)
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def render(self, job: Dict[str, Any]):
+        """Отправляет задачу и ждет ответа воркера"""
+        try:
+            self.proc.stdin.write(_dumps(job).decode() + '\n')
+            self.proc.stdin.flush()
+            line = self.proc.stdout.readline()
+        except BrokenPipeError:
+            line = ''
+
+        if not line:
+            returncode = self.proc.wait()
+            self._stderr.join(timeout=1)
+            raise subprocess.CalledProcessError(
+                returncode, self.cmd, stderr='\n'.join(self.tail))
+
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise RuntimeError(f"Remotion render failed: {reply.get('error')}")
+
+    def close(self):
+        """Закрывает stdin - воркер дорендеривает и выходит"""
+        if self.alive:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
 
 class RemotionModule(BaseModule):
     """
@@ -24,6 +122,19 @@ class RemotionModule(BaseModule):
     COMPONENT: TitleCard  # автоматически использует RemotionModule
     """
 
+    # render_batch сам распараллеливает пачку на пуле воркеров: движок
+    # не должен делить ее между процессами, иначе у каждого процесса
+    # свой пул и свои бандлы
+    batch_in_one_process = True
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+
+        # Пул постоянных воркеров, процессы стартуют по требованию
+        self._pool_size = config.get('render', {}).get('remotion_workers', 4)
+        self._workers = queue.SimpleQueue()
+        self._worker_slots = threading.BoundedSemaphore(self._pool_size)
+
     @property
     def module_type(self) -> str:
         return "remotion"
@@ -47,50 +158,223 @@ class RemotionModule(BaseModule):
         Returns:
             Path к видео файлу
         """
-        component_name = scene_data['component']
-        duration_frames = int(
-            scene_data.get('duration', 10.0) * self.get_fps())
+        return asyncio.run(self.render_async(scene_data))
 
-        self.log(f"Rendering Remotion component: {component_name}")
+    async def render_async(self, scene_data: Dict[str, Any]) -> Path:
+        """
+        Асинхронная версия render
 
-        # Output path
-        output_file = self.output_dir / f"{component_name}.mp4"
+        Рендер идет в отдельном процессе, event loop не блокируется -
+        несколько компонентов можно рендерить параллельно через
+        asyncio.gather.
+        """
+        if _WORKER_SCRIPT.exists():
+            return (await self.render_batch_async([scene_data]))[0]
+
+        component_name, output_file, duration_frames, props, key = \
+            self._prepare(scene_data)
+
+        if self.cache_lookup(output_file, key):
+            return output_file
+
+        self.log(f"Rendering Remotion component: {component_name}")
 
-        # Remotion command
+        # Remotion command (runs from remotion/)
         cmd = [
             'npx', 'remotion', 'render',
-            'remotion/src/index.ts',
+            'src/index.ts',
             component_name,
-            str(output_file),
+            str(output_file.resolve()),
             '--frames', str(duration_frames),
             '--codec', 'h264'
         ]
 
-        # Add props as input-props
-        props = {k: v for k, v in scene_data.items()
-                 if k not in ['component', 'duration', 'module']}
-
+        # Add props as input-props. Passed as a file: a JSON argument
+        # can hit the OS command line length limit
+        props_file = None
         if props:
-            import json
-            props_json = json.dumps(props)
-            cmd.extend(['--props', props_json])
+            with tempfile.NamedTemporaryFile(suffix='.json',
+                                             delete=False) as f:
+                f.write(_dumps(props))
+            props_file = f.name
+            cmd.extend(['--props', props_file])
 
         self.log(f"Command: {' '.join(cmd)}")
 
         try:
-            result = subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True,
-                cwd='remotion'
-            )
+            await self._run(cmd)
+        finally:
+            if props_file:
+                os.unlink(props_file)
+        self.cache_store(output_file, key)
+
+        self.log(f"✓ Rendered: {output_file}")
+        return output_file
+
+    def render_batch(self, scene_data_list: List[Dict[str, Any]]) -> List[Path]:
+        """
+        Рендерит несколько компонентов на пуле воркеров Node
+
+        Returns:
+            Пути к видео файлам в порядке scene_data_list
+        """
+        return asyncio.run(self.render_batch_async(scene_data_list))
+
+    async def render_batch_async(self, scene_data_list: List[Dict[str, Any]]
+                                 ) -> List[Path]:
+        """
+        Асинхронная версия render_batch
+
+        Запуск Node и сборка webpack-бандла Remotion занимают секунды,
+        поэтому компоненты рендерятся на постоянных воркерах
+        (remotion/worker.mjs): бандл собирается один раз на воркер и
+        переиспользуется между пачками. Воркеров не больше
+        render.remotion_workers (по умолчанию 4). Если скрипта нет -
+        каждый компонент рендерится своим npx, тоже не больше
+        render.remotion_workers одновременно.
+        """
+        if not _WORKER_SCRIPT.exists():
+            slots = asyncio.Semaphore(self._pool_size)
+
+            async def render_npx(scene_data):
+                async with slots:
+                    return await self.render_async(scene_data)
+
+            return list(await asyncio.gather(
+                *(render_npx(scene_data) for scene_data in scene_data_list)))
+
+        jobs = [self._prepare(scene_data) for scene_data in scene_data_list]
+        outputs = [job[1] for job in jobs]
+
+        # Only uncached components, each distinct output once
+        pending = {}
+        for job in jobs:
+            if job[1] not in pending and not self.cache_lookup(job[1], job[4]):
+                pending[job[1]] = job
+        if not pending:
+            return outputs
+
+        self.log(f"Rendering Remotion components: "
+                 f"{', '.join(job[0] for job in pending.values())}")
+
+        async def render_one(component_name, output_file, duration_frames,
+                             props, key):
+            await asyncio.to_thread(self._render_on_worker, {
+                'component': component_name,
+                'output': str(output_file.resolve()),
+                'frames': duration_frames,
+                'props': props,
+                'codec': 'h264',
+            })
+            self.cache_store(output_file, key)
             self.log(f"✓ Rendered: {output_file}")
-            return output_file
 
-        except subprocess.CalledProcessError as e:
-            self.log(f"✗ Remotion error: {e.stderr}")
+        results = await asyncio.gather(
+            *(render_one(*job) for job in pending.values()),
+            return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return outputs
+
+    def _render_on_worker(self, job: Dict[str, Any]):
+        """Рендерит задачу на свободном воркере, блокирует поток"""
+        worker = self._acquire_worker()
+        try:
+            worker.render(job)
+        finally:
+            self._release_worker(worker)
+
+    def _acquire_worker(self) -> RemotionWorker:
+        """Свободный воркер из пула; новый, пока пул не заполнен"""
+        self._worker_slots.acquire()
+        try:
+            return self._workers.get_nowait()
+        except queue.Empty:
+            pass
+
+        try:
+            worker = RemotionWorker(self.log)
+        except FileNotFoundError:
+            self._worker_slots.release()
+            self.log("✗ Remotion not installed! Run: npm install in remotion/")
             raise
+        except BaseException:
+            self._worker_slots.release()
+            raise
+        atexit.register(worker.close)
+        return worker
+
+    def _release_worker(self, worker: RemotionWorker):
+        """Возвращает живой воркер в пул, упавший выбрасывает"""
+        if worker.alive:
+            self._workers.put(worker)
+        else:
+            atexit.unregister(worker.close)
+        self._worker_slots.release()
+
+    def render_key(self, scene_data: Dict[str, Any]) -> str:
+        """Ключ кэша: компонент, длительность в кадрах и props"""
+        return self._prepare(scene_data)[4]
+
+    def _prepare(self, scene_data: Dict[str, Any]
+                 ) -> Tuple[str, Path, int, Dict[str, Any], str]:
+        """
+        Возвращает (компонент, output path, кадры, props, ключ кэша)
+
+        Имя файла содержит хэш компонента, длительности и props -
+        рендеры с разными props не перетирают друг друга, а неизменные
+        берутся из кэша.
+        """
+        component_name = scene_data['component']
+        duration_frames = int(
+            scene_data.get('duration', 10.0) * self.get_fps())
+
+        props = {k: v for k, v in scene_data.items()
+                 if k not in _RESERVED_PROPS}
+
+        key = self._cache_key(component_name, duration_frames, props)
+
+        # Output path
+        output_file = self.output_dir / f"{component_name}-{key}.mp4"
+
+        return component_name, output_file, duration_frames, props, key
+
+    @staticmethod
+    def _cache_key(component_name: str, duration_frames: int,
+                   props: Dict[str, Any]) -> str:
+        """Хэш компонента, длительности и канонического JSON props"""
+        canonical = json.dumps(props, sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(
+            f"{component_name}\0{duration_frames}\0{canonical}".encode()
+        ).hexdigest()[:16]
+
+    async def _run(self, cmd: List[str]):
+        """
+        Запускает команду в remotion/
+
+        stderr читается построчно и сразу уходит в лог, а не копится в
+        памяти до конца рендера; последние строки попадают в исключение.
+        """
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                cwd='remotion'
+            )
         except FileNotFoundError:
             self.log("✗ Remotion not installed! Run: npm install in remotion/")
-            raise
\ No newline at end of file
+            raise
+
+        tail = collections.deque(maxlen=20)
+        async for line in proc.stderr:
+            line = line.decode(errors='replace').rstrip()
+            self.log(line)
+            tail.append(line)
+
+        returncode = await proc.wait()
+        if returncode:
+            self.log(f"✗ Remotion error (exit code {returncode})")
+            raise subprocess.CalledProcessError(
+                returncode, cmd, stderr='\n'.join(tail))
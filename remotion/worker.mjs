@@ -0,0 +1,65 @@
+/**
+ * Постоянный воркер рендера Remotion
+ *
+ * Собирает бандл проекта один раз при старте, затем рендерит задачи
+ * из stdin - по одному JSON на строку:
+ *
+ *   {"component": "TitleCard", "output": "/abs/path.mp4",
+ *    "frames": 300, "props": {...}, "codec": "h264"}
+ *
+ * На каждую задачу отвечает одной строкой в stdout:
+ *
+ *   {"ok": true, "output": "/abs/path.mp4"}
+ *   {"ok": false, "error": "..."}
+ *
+ * Логи идут в stderr, stdout занят только ответами.
+ *
+ * Запуск (из remotion/): node worker.mjs [src/index.ts]
+ */
+
+import path from 'node:path';
+import readline from 'node:readline';
+import {bundle} from '@remotion/bundler';
+import {renderMedia, selectComposition} from '@remotion/renderer';
+
+// Keep stdout clean for the protocol
+console.log = console.error;
+
+const reply = (message) => {
+  process.stdout.write(JSON.stringify(message) + '\n');
+};
+
+const entry = process.argv[2] ?? 'src/index.ts';
+const serveUrl = await bundle({entryPoint: path.resolve(entry)});
+console.error(`Bundled ${entry}`);
+
+const lines = readline.createInterface({input: process.stdin});
+
+for await (const line of lines) {
+  if (!line.trim()) {
+    continue;
+  }
+
+  try {
+    const job = JSON.parse(line);
+    const inputProps = job.props ?? {};
+    const composition = await selectComposition({
+      serveUrl,
+      id: job.component,
+      inputProps,
+    });
+
+    await renderMedia({
+      serveUrl,
+      composition: {...composition, durationInFrames: job.frames},
+      codec: job.codec ?? 'h264',
+      outputLocation: job.output,
+      inputProps,
+    });
+
+    console.error(`Rendered ${job.output}`);
+    reply({ok: true, output: job.output});
+  } catch (error) {
+    reply({ok: false, error: String(error?.stack ?? error)});
+  }
+}
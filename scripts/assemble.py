@@ -4,14 +4,47 @@
 Парсит outline.md и собирает финальное видео
 """
 
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import math
+import mmap
+import sys
 import yaml
 import re
 import os
 from pathlib import Path
-from typing import List, Dict
-from dataclasses import dataclass
+from typing import List, Dict, Any, Tuple, Iterator
+from array import array
+from dataclasses import dataclass, astuple
+from itertools import accumulate
 
-@dataclass
+# Корень проекта в путь, чтобы импортировать core/ и modules/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# libyaml C loader when available, pure-Python fallback otherwise
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# Заголовки секций "## ..." (по байтам mmap) и "Title [MM:SS-MM:SS]"
+_SECTION_RE = re.compile(rb'(?m)^## (.+)$')
+_HEADER_RE = re.compile(r'(.+?)\s*\[(.+?)\]')
+# Известные параметры секции: KEY: value / KEY: "value"
+_PARAMS_RE = re.compile(
+    r'(?m)^[ \t]*(TEXT|TYPE|VISUAL|SCENE|COMPONENT|MODULE)[ \t]*:[ \t]*'
+    r'"?(.*?)"?[ \t]*\r?$')
+
+# Поле сегмента -> исходники бэкенда, от которых зависит его видео
+_BACKEND_INPUTS = {
+    'scene': ('manim/manim_module.py',),
+    'component': ('remotion/src', 'remotion/worker.mjs'),
+}
+
+@dataclass(slots=True, frozen=True)
 class Segment:
     """Сегмент видео"""
     title: str
@@ -24,35 +57,117 @@ class Segment:
     duration: float = 10.0
 
 
+class SegmentTable:
+    """
+    Сегменты по колонкам (structure of arrays)
+    
+    Строковые поля - списки, длительности - непрерывный array('d').
+    numpy импортируется только при обращении к durations (view без
+    копирования) - план без рендера его не загружает.
+    Индексация и итерация отдают Segment, как обычный список.
+    """
+    
+    __slots__ = ('titles', 'timestamps', 'texts', 'seg_types', 'visuals',
+                 'scenes', 'components', '_durations')
+    
+    def __init__(self, titles: List[str], timestamps: List[str],
+                 texts: List[str], seg_types: List[str], visuals: List[str],
+                 scenes: List[str], components: List[str],
+                 durations: array):
+        self.titles = titles
+        self.timestamps = timestamps
+        self.texts = texts
+        self.seg_types = seg_types
+        self.visuals = visuals
+        self.scenes = scenes
+        self.components = components
+        self._durations = durations
+    
+    @classmethod
+    def from_segments(cls, segments: List[Segment]) -> 'SegmentTable':
+        """Собирает таблицу из списка сегментов"""
+        return cls(
+            titles=[seg.title for seg in segments],
+            timestamps=[seg.timestamp for seg in segments],
+            texts=[seg.text for seg in segments],
+            seg_types=[seg.seg_type for seg in segments],
+            visuals=[seg.visual for seg in segments],
+            scenes=[seg.scene for seg in segments],
+            components=[seg.component for seg in segments],
+            durations=array('d', (seg.duration for seg in segments)),
+        )
+    
+    @property
+    def durations(self):
+        """Длительности как numpy.ndarray float64 (view на колонку)"""
+        import numpy as np
+        return np.frombuffer(self._durations, dtype=np.float64)
+    
+    @property
+    def total_duration(self) -> float:
+        """Общая длительность в секундах"""
+        return math.fsum(self._durations)
+    
+    @property
+    def starts(self) -> List[float]:
+        """Время начала каждого сегмента в готовом видео"""
+        return list(accumulate(self._durations, initial=0.0))[:-1]
+    
+    def __len__(self) -> int:
+        return len(self.titles)
+    
+    def __getitem__(self, i: int) -> Segment:
+        return Segment(
+            title=self.titles[i],
+            timestamp=self.timestamps[i],
+            text=self.texts[i],
+            seg_type=self.seg_types[i],
+            visual=self.visuals[i],
+            scene=self.scenes[i],
+            component=self.components[i],
+            duration=self._durations[i],
+        )
+    
+    def __iter__(self) -> Iterator[Segment]:
+        for i in range(len(self)):
+            yield self[i]
+
+
 class OutlineParser:
     """Парсер outline.md файла"""
     
     def __init__(self, outline_path: str):
         self.outline_path = outline_path
-        self.segments: List[Segment] = []
+        self.segments = SegmentTable.from_segments([])
     
-    def parse(self) -> List[Segment]:
-        """Парсит outline и возвращает список сегментов"""
-        with open(self.outline_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Разбиваем на секции по заголовкам ##
-        sections = re.split(r'\n## ', content)
+    def parse(self) -> SegmentTable:
+        """Парсит outline и возвращает таблицу сегментов"""
+        segments: List[Segment] = []
+        with open(self.outline_path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # пустой файл
+                return self.segments
         
-        for section in sections[1:]:  # Пропускаем первый элемент (заголовок документа)
-            segment = self._parse_section(section)
-            if segment:
-                self.segments.append(segment)
+        with mm:
+            # Секция - от "## " до следующего заголовка ##
+            # (всё до первого заголовка - заголовок документа)
+            headers = list(_SECTION_RE.finditer(mm))
+            for i, match in enumerate(headers):
+                end = headers[i + 1].start() if i + 1 < len(headers) else len(mm)
+                section = mm[match.start() + 3:end].decode('utf-8')
+                segment = self._parse_section(section)
+                if segment:
+                    segments.append(segment)
         
+        self.segments = SegmentTable.from_segments(segments)
         return self.segments
     
     def _parse_section(self, section: str) -> Segment:
         """Парсит одну секцию outline"""
-        lines = section.strip().split('\n')
-        
         # Первая строка - заголовок с timestamp
-        header = lines[0]
-        match = re.match(r'(.+?)\s*\[(.+?)\]', header)
+        section = section.lstrip()
+        match = _HEADER_RE.match(section)
         
         if not match:
             return None
@@ -60,16 +175,18 @@ class OutlineParser:
         title = match.group(1).strip()
         timestamp = match.group(2).strip()
         
-        # Парсим временные метки
-        start, end = timestamp.split('-')
-        duration = self._parse_time(end) - self._parse_time(start)
+        # Парсим временные метки (формат фиксированный: MM:SS-MM:SS)
+        dash = timestamp.find('-')
+        if dash < 0:
+            raise ValueError(f"Invalid timestamp format: {timestamp}")
+        try:
+            duration = (self._parse_time(timestamp[dash + 1:])
+                        - self._parse_time(timestamp[:dash]))
+        except ValueError:
+            raise ValueError(f"Invalid timestamp format: {timestamp}") from None
         
-        # Парсим параметры
-        params = {}
-        for line in lines[1:]:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                params[key.strip()] = value.strip().strip('"')
+        # Парсим параметры - один проход регулярки по тексту секции
+        params = dict(_PARAMS_RE.findall(section, match.end()))
         
         return Segment(
             title=title,
@@ -83,24 +200,58 @@ class OutlineParser:
         )
     
     def _parse_time(self, time_str: str) -> float:
-        """Конвертирует время из формата MM:SS в секунды"""
-        parts = time_str.split(':')
-        if len(parts) == 2:
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        return float(parts[0])
+        """Конвертирует время из формата MM:SS (или H:MM:SS, SS) в секунды"""
+        colon = time_str.find(':')
+        if colon < 0:
+            return float(time_str)
+        if time_str.find(':', colon + 1) < 0:
+            return int(time_str[:colon]) * 60 + int(time_str[colon + 1:])
+        
+        seconds = 0
+        for part in time_str.split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config(path: str, mtime: float) -> Dict[str, Any]:
+    """Читает config.yaml; mtime в ключе кэша сбрасывает его при изменении"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_Loader)
 
 
 class VideoBuilder:
     """Сборщик финального видео"""
     
-    def __init__(self, config_path: str = 'config.yaml'):
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path: str = 'config.yaml', workers: int = None):
+        self.config = _load_config(config_path, os.stat(config_path).st_mtime)
         
         self.project_root = Path(__file__).parent.parent
+        self.workers = workers
+        self.registry = None
     
-    def build(self, segments: List[Segment], output_path: str = None):
+    def lane_size(self, module_type: str) -> int:
+        """
+        Сколько задач модуля рендерится одновременно
+        
+        У бэкендов разный профиль нагрузки (Manim - CPU + Cairo,
+        Remotion - Node + Chromium + GPU), поэтому лимиты раздельные:
+        render.manim_workers (по умолчанию все ядра),
+        render.remotion_workers (по умолчанию 4), остальные модули -
+        render.workers. --workers задает лимит для всех сразу.
+        """
+        if self.workers:
+            return self.workers
+        
+        render = self.config.get('render', {})
+        if module_type == 'manim':
+            return render.get('manim_workers', os.cpu_count() or 1)
+        if module_type == 'remotion':
+            return render.get('remotion_workers', 4)
+        return render.get('workers', max(1, (os.cpu_count() or 2) - 1))
+    
+    def build(self, segments: SegmentTable, output_path: str = None,
+              render: bool = False):
         """Собирает финальное видео из сегментов"""
         
         if output_path is None:
@@ -110,34 +261,218 @@ class VideoBuilder:
         print(f"  Сборка видео: {self.config['project']['name']}")
         print(f"{'='*60}\n")
         
-        print(f"📋 Всего сегментов: {len(segments)}\n")
+        print(f"📋 Всего сегментов: {len(segments)} | "
+              f"Длительность: {segments.total_duration:g}s\n")
         
-        for i, seg in enumerate(segments, 1):
-            print(f"  {i}. {seg.title} [{seg.timestamp}]")
-            print(f"     Тип: {seg.seg_type} | Длительность: {seg.duration}s")
+        starts = segments.starts
+        for i, seg in enumerate(segments):
+            print(f"  {i + 1}. {seg.title} [{seg.timestamp}]")
+            print(f"     Тип: {seg.seg_type} | Длительность: {seg.duration:g}s"
+                  f" | Начало: {starts[i]:g}s")
             if seg.scene:
                 print(f"     Manim сцена: {seg.scene}")
             if seg.component:
                 print(f"     Remotion компонент: {seg.component}")
             print()
         
+        if render:
+            self._render(segments, Path(output_path))
+        
         print(f"\n{'='*60}")
         print(f"  ✓ План сборки готов!")
         print(f"{'='*60}\n")
         
         return segments
+    
+    def _render(self, segments: SegmentTable, output_path: Path):
+        """
+        Рендерит только изменившиеся сегменты
+        
+        .build_manifest.json рядом с выходным файлом хранит
+        {хэш сегмента: путь к видео или null} прошлой сборки. Сегменты,
+        чей хэш там есть и файл на месте (или модуля для них нет), не
+        отправляются в модули вовсе - поэтому в хэш входят и исходники
+        бэкенда (сцены Manim, компоненты Remotion), иначе правка сцены
+        не дошла бы до кэша модуля.
+        """
+        manifest_path = output_path.with_name('.build_manifest.json')
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            manifest = {}
+        
+        inputs = {field: self._inputs_digest(paths)
+                  for field, paths in _BACKEND_INPUTS.items()}
+        # Сегмент без модуля (null в манифесте) перерендерится, когда
+        # набор зарегистрированных модулей изменится
+        inputs['modules'] = sorted(self._get_registry().modules)
+        hashes = [self._segment_hash(seg, inputs) for seg in segments]
+        changed = [i for i, h in enumerate(hashes)
+                   if h not in manifest
+                   or manifest[h] is not None and not Path(manifest[h]).exists()]
+        
+        print(f"🎨 Рендеринг сегментов: {len(changed)} из {len(segments)} "
+              f"изменились\n")
+        rendered = asyncio.run(self.build_async([segments[i] for i in changed]))
+        
+        results = {h: manifest[h] for h in hashes if h in manifest}
+        results.update((hashes[i], result)
+                       for i, result in zip(changed, rendered))
+        
+        for seg, h in zip(segments, hashes):
+            result = results.get(h)
+            if isinstance(result, Exception):
+                print(f"  ✗ {seg.title}: {result}")
+            elif result is not None:
+                print(f"  ✓ {seg.title}: {result}")
+        
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(
+            {h: None if result is None else str(result)
+             for h, result in results.items()
+             if not isinstance(result, Exception)},
+            ensure_ascii=False, indent=2), encoding='utf-8')
+    
+    def _segment_hash(self, seg: Segment, inputs: Dict[str, str]) -> str:
+        """
+        Хэш содержимого сегмента, настроек рендера и исходников бэкенда
+        
+        inputs - хэши исходников из _inputs_digest по полю сегмента
+        (учитываются только поля, заданные у сегмента) и список
+        зарегистрированных модулей под ключом 'modules'. blake2b по
+        каноническому JSON, а не hash(): хэши строк в Python меняются
+        между запусками.
+        """
+        backend = {field: digest for field, digest in inputs.items()
+                   if field == 'modules' or getattr(seg, field)}
+        canonical = json.dumps(
+            [astuple(seg), backend,
+             self.config.get('project'), self.config.get('render')],
+            sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _inputs_digest(paths: Tuple[str, ...]) -> str:
+        """Хэш содержимого файлов (каталоги - рекурсивно), пути от cwd"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in map(Path, paths):
+            files = sorted(path.rglob('*')) if path.is_dir() else [path]
+            for file in files:
+                if file.is_file():
+                    digest.update(f"{file}\0".encode())
+                    digest.update(file.read_bytes())
+        return digest.hexdigest()
+    
+    async def build_async(self, segments: List[Segment]) -> List[Any]:
+        """
+        Рендерит все сегменты параллельно
+        
+        У каждого модуля своя очередь с лимитом lane_size, так что
+        тяжелый бэкенд не занимает слоты другого. Сегменты модулей с
+        пакетным рендером (Remotion, Manim) делятся на lane_size пачек -
+        бандл/импорты грузятся раз на пачку. Задачи запускаются в
+        порядке сегментов. Возвращает по элементу на сегмент: путь к
+        видео, None (сегмент без Manim сцены / Remotion компонента)
+        или исключение.
+        """
+        registry = self._get_registry()
+        
+        # module_type -> (module, [(индекс сегмента, scene_data)])
+        groups: Dict[str, Tuple[Any, list]] = {}
+        for i, seg in enumerate(segments):
+            scene_data = self._scene_data(seg)
+            module = registry.get_module(scene_data)
+            if module is None:
+                continue
+            groups.setdefault(module.module_type, (module, []))[1].append(
+                (i, scene_data))
+        
+        lanes = {module_type: asyncio.Semaphore(self.lane_size(module_type))
+                 for module_type in groups}
+        
+        jobs = []
+        for module_type, (module, items) in groups.items():
+            if hasattr(module, 'render_batch'):
+                n = min(self.lane_size(module_type), len(items))
+                jobs.extend((module, items[k::n]) for k in range(n))
+            else:
+                jobs.extend((module, [item]) for item in items)
+        jobs.sort(key=lambda job: job[1][0][0])
+        
+        async def render_job(module, items) -> List[Path]:
+            scene_data_list = [scene_data for _, scene_data in items]
+            async with lanes[module.module_type]:
+                if hasattr(module, 'render_batch_async'):
+                    return await module.render_batch_async(scene_data_list)
+                if hasattr(module, 'render_batch'):
+                    return await asyncio.to_thread(module.render_batch,
+                                                   scene_data_list)
+                return [await asyncio.to_thread(module.render,
+                                                scene_data_list[0])]
+        
+        tasks = []
+        for module, items in jobs:
+            tasks.append(asyncio.ensure_future(render_job(module, items)))
+            # Даем задаче стартовать до создания следующей
+            await asyncio.sleep(0)
+        
+        results: List[Any] = [None] * len(segments)
+        for (module, items), paths in zip(
+                jobs, await asyncio.gather(*tasks, return_exceptions=True)):
+            if isinstance(paths, Exception):
+                paths = [paths] * len(items)
+            for (i, _), path in zip(items, paths):
+                results[i] = path
+        
+        return results
+    
+    def _get_registry(self):
+        """Реестр модулей, создается при первом рендере"""
+        if self.registry is None:
+            from rich.console import Console
+            from core.base_module import ModuleRegistry
+            from core.engine import register_modules
+            
+            self.registry = ModuleRegistry(self.config, verbose=False)
+            register_modules(self.registry, Console())
+        return self.registry
+    
+    @staticmethod
+    def _scene_data(seg: Segment) -> Dict[str, Any]:
+        """Данные сегмента в формате scene_data модулей"""
+        scene_data = {
+            'title': seg.title,
+            'text': seg.text,
+            'duration': seg.duration,
+        }
+        if seg.scene:
+            scene_data['scene'] = seg.scene
+        if seg.component:
+            scene_data['component'] = seg.component
+        return scene_data
 
 
 def main():
     """Главная функция"""
     
+    arg_parser = argparse.ArgumentParser(description='Сборка видео из outline.md')
+    arg_parser.add_argument('--render', action='store_true',
+                            help='Рендерить сегменты (по умолчанию только план)')
+    arg_parser.add_argument('--workers', '-j', type=int,
+                            help='Сколько задач каждого модуля рендерить '
+                                 'одновременно (по умолчанию из config.yaml)')
+    args = arg_parser.parse_args()
+    
     # Парсим outline
     parser = OutlineParser('outline.md')
     segments = parser.parse()
     
     # Строим видео
-    builder = VideoBuilder()
-    builder.build(segments)
+    builder = VideoBuilder(workers=args.workers)
+    builder.build(segments, render=args.render)
+    
+    if args.render:
+        return
     
     print("✓ Тестовый прогон завершен успешно!\n")
     print("Следующие шаги:")
@@ -3,9 +3,11 @@
 Скрипт проверки и установки зависимостей
 """
 
+import importlib.util
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 def check_command(command):
     """Проверяет наличие команды в системе"""
@@ -18,12 +20,13 @@ def check_command(command):
         return False
 
 def check_python_package(package):
-    """Проверяет установлен ли Python пакет"""
-    try:
-        __import__(package)
-        return True
-    except ImportError:
-        return False
+    """
+    Проверяет установлен ли Python пакет
+
+    Только ищет пакет через finders, не импортируя его - импорт manim
+    или moviepy тянет numpy, cairo и т.д. и занимает секунды
+    """
+    return importlib.util.find_spec(package) is not None
 
 def main():
     """Проверка всех зависимостей"""
@@ -41,8 +44,13 @@ def main():
         'npm': 'NPM'
     }
     
+    # Проверки независимы - запускаем параллельно, печатаем по порядку
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tools_found = dict(zip(system_tools,
+                               executor.map(check_command, system_tools)))
+    
     for cmd, name in system_tools.items():
-        status = "✓" if check_command(cmd) else "✗"
+        status = "✓" if tools_found[cmd] else "✗"
         print(f"  {status} {name}")
     
     print()
@@ -57,8 +65,13 @@ def main():
         'rich': 'Rich'
     }
     
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        packages_found = dict(zip(python_packages,
+                                  executor.map(check_python_package,
+                                               python_packages)))
+    
     for pkg, name in python_packages.items():
-        status = "✓" if check_python_package(pkg) else "✗"
+        status = "✓" if packages_found[pkg] else "✗"
         print(f"  {status} {name}")
     
     print("\n" + "="*60)
@@ -68,7 +81,7 @@ def main():
     # Установка Python пакетов
     missing_packages = []
     for pkg, name in python_packages.items():
-        if not check_python_package(pkg):
+        if not packages_found[pkg]:
             missing_packages.append(pkg if pkg != 'PIL' else 'pillow')
     
     if missing_packages: